@@ -7,50 +7,127 @@ API Key Resolution Order:
 1. Environment variable ANTHROPIC_API_KEY (for CI/CD)
 2. Project config: ./.letter-config.json
 3. Global config: ~/.config/letter-for-my-future-self/config.json
+
+Optional dependencies and some stdlib modules are imported lazily. Set
+MINITIK_EAGER_IMPORT=1 to import them all at load time instead, so a
+broken deferred import fails immediately (useful in CI).
 """
 
 import os
+import re
 import sys
-import json
+import functools
+import importlib.util
 from pathlib import Path
-from datetime import datetime
 
 # Defer heavy imports until needed (allows --help, --status without dependencies)
-anthropic = None
-def _load_anthropic():
-    global anthropic
-    if anthropic is None:
-        try:
-            import anthropic as _anthropic
-            anthropic = _anthropic
-        except ImportError:
-            print("❌ anthropic package not installed")
-            print("   Run: pip install anthropic")
-            sys.exit(1)
-    return anthropic
-
-# Load .env if available (optional)
-try:
-    from dotenv import load_dotenv
-    load_dotenv()
-except ImportError:
-    pass  # dotenv is optional
+def lazy_import(name: str):
+    """Import a module lazily; returns None if it is not installed"""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        return None
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+# Letter filename pattern: groups 1-2 match the new format, group 3 the old one
+_LETTER_RE = re.compile(r'^letter_(?:(\d{8})_(\d{4})|(\d+))\.md$')
 
 # Config file names
 PROJECT_CONFIG = ".letter-config.json"
 GLOBAL_CONFIG_DIR = Path.home() / ".config" / "letter-for-my-future-self"
 GLOBAL_CONFIG = GLOBAL_CONFIG_DIR / "config.json"
 
+# Config files are tiny; anything bigger is corrupt or the wrong file
+MAX_CONFIG_BYTES = 64 * 1024
+
+# Upper bound on memory content sent to the API (keeps the tail)
+MAX_MEMORY_CHARS = 60_000
+
+# Prompt skeleton; the memory content goes between prefix and suffix
+_PROMPT_PREFIX = """You are a technical blog writer. Convert this development session memory into an engaging, public-ready blog post.
+
+INPUT (Session Memory):
+"""
+_PROMPT_SUFFIX_TMPL = """
+
+REQUIREMENTS:
+1. Transform technical decisions into narrative insights
+2. Keep the "Pain Log" as "Lessons Learned" or "Challenges"
+3. Make it readable for a general developer audience
+4. Add markdown frontmatter with: title, date, tags, excerpt
+5. Use proper markdown formatting with headers, code blocks, lists
+6. Maintain technical accuracy but improve readability
+
+OUTPUT FORMAT:
+---
+title: "[Engaging Title]"
+date: {date}
+tags: [relevant, tags, here]
+excerpt: "Brief summary of the post"
+---
+
+[Blog post content in markdown]
+
+Generate the blog post now:"""
 
-def get_api_key() -> str | None:
+# Today's date as YYYY-MM-DD, only reformatted when the day changes
+_DATE_CACHE = {'day': None, 'str': None}
+def _today_str() -> str:
+    from datetime import date
+    today = date.today()
+    if _DATE_CACHE['day'] != today:
+        _DATE_CACHE['day'] = today
+        _DATE_CACHE['str'] = today.strftime('%Y-%m-%d')
+    return _DATE_CACHE['str']
+
+
+@functools.lru_cache(maxsize=8)
+def _load_config(path_str: str, mtime: float) -> dict:
+    """Parse a config file, cached per path and modification time"""
+    import json
+    with open(path_str, 'rb') as f:
+        return json.load(f)
+
+
+def _read_config(path: Path, max_bytes: int = MAX_CONFIG_BYTES) -> dict:
+    """Read a config file through the parse cache, refusing oversized files"""
+    st = path.stat()
+    if st.st_size > max_bytes:
+        raise ValueError(f"config {path} exceeds {max_bytes} bytes")
+    config = _load_config(str(path), st.st_mtime)
+    if not isinstance(config, dict):
+        raise ValueError(f"config {path} is not a JSON object")
+    return config
+
+
+def _load_dotenv():
+    """Load .env if available (optional), unless the key is already exported"""
+    if not os.environ.get('ANTHROPIC_API_KEY'):
+        dotenv = lazy_import('dotenv')
+        if dotenv is not None:  # dotenv is optional
+            dotenv.load_dotenv()
+
+
+def get_api_key(env_key: str | None = None) -> str | None:
     """
     Resolve API key with priority:
     1. Environment variable (CI/CD, explicit override)
     2. Project config (.letter-config.json in current dir)
     3. Global config (~/.config/letter-for-my-future-self/config.json)
+
+    env_key is the already-read ANTHROPIC_API_KEY value; if None, the
+    environment (and .env) is consulted.
     """
     # 1. Environment variable (highest priority)
-    env_key = os.getenv('ANTHROPIC_API_KEY')
+    if env_key is None:
+        _load_dotenv()
+        env_key = os.getenv('ANTHROPIC_API_KEY')
     if env_key:
         print("🔑 Using API key from environment variable")
         return env_key
@@ -59,118 +136,135 @@ def get_api_key() -> str | None:
     project_config = Path(PROJECT_CONFIG)
     if project_config.exists():
         try:
-            config = json.loads(project_config.read_text())
+            config = _read_config(project_config)
             if config.get('anthropic_api_key'):
                 print("🔑 Using API key from project config (.letter-config.json)")
                 return config['anthropic_api_key']
-        except (json.JSONDecodeError, KeyError) as e:
+        except (OSError, ValueError, KeyError) as e:
             print(f"⚠️  Warning: Could not read project config: {e}")
 
     # 3. Global config
     if GLOBAL_CONFIG.exists():
         try:
-            config = json.loads(GLOBAL_CONFIG.read_text())
+            config = _read_config(GLOBAL_CONFIG)
             if config.get('anthropic_api_key'):
                 print("🔑 Using API key from global config (~/.config/letter-for-my-future-self/)")
                 return config['anthropic_api_key']
-        except (json.JSONDecodeError, KeyError) as e:
+        except (OSError, ValueError, KeyError) as e:
             print(f"⚠️  Warning: Could not read global config: {e}")
 
     return None
 
 
+def _upsert_config(path: Path, key: str, value: str):
+    """Set a single key in a JSON config file, creating the file if needed"""
+    import json
+    with open(path, 'r+' if path.exists() else 'w+', encoding='utf-8') as f:
+        content = f.read()
+        config = json.loads(content) if content else {}
+        config[key] = value
+        f.seek(0)
+        f.truncate()
+        json.dump(config, f, indent=2)
+
+
 def setup_api_key(scope: str = "global"):
     """Interactive setup for API key configuration"""
-    print("\n🔧 Letter to My Future Self - API Key Setup\n")
-
-    api_key = input("Enter your Anthropic API key: ").strip()
+    api_key = input(
+        "\n🔧 Letter to My Future Self - API Key Setup\n\n"
+        "Enter your Anthropic API key: "
+    ).strip()
 
     if not api_key:
         print("❌ No API key provided")
         sys.exit(1)
 
+    lines: list[str] = []
     if scope == "project":
-        config_path = Path(PROJECT_CONFIG)
-        config = {}
-        if config_path.exists():
-            config = json.loads(config_path.read_text())
-        config['anthropic_api_key'] = api_key
-        config_path.write_text(json.dumps(config, indent=2))
-        print(f"✅ API key saved to {PROJECT_CONFIG}")
-        print(f"⚠️  Add '{PROJECT_CONFIG}' to your .gitignore!")
+        _upsert_config(Path(PROJECT_CONFIG), 'anthropic_api_key', api_key)
+        lines.append(f"✅ API key saved to {PROJECT_CONFIG}\n")
+        lines.append(f"⚠️  Add '{PROJECT_CONFIG}' to your .gitignore!\n")
     else:
         GLOBAL_CONFIG_DIR.mkdir(parents=True, exist_ok=True)
-        config = {}
-        if GLOBAL_CONFIG.exists():
-            config = json.loads(GLOBAL_CONFIG.read_text())
-        config['anthropic_api_key'] = api_key
-        GLOBAL_CONFIG.write_text(json.dumps(config, indent=2))
+        _upsert_config(GLOBAL_CONFIG, 'anthropic_api_key', api_key)
         os.chmod(GLOBAL_CONFIG, 0o600)  # Restrict permissions
-        print(f"✅ API key saved to {GLOBAL_CONFIG}")
+        lines.append(f"✅ API key saved to {GLOBAL_CONFIG}\n")
 
-    print("\n🎉 Setup complete! You can now run the blog generator.")
+    lines.append("\n🎉 Setup complete! You can now run the blog generator.\n")
+    sys.stdout.write("".join(lines))
 
 
-def show_config_status():
-    """Show current API key configuration status"""
-    print("\n📋 API Key Configuration Status\n")
+def show_config_status(env_key: str | None = None, env_only: bool = False):
+    """Show current API key configuration status (env_only skips config files)"""
+    lines: list[str] = []
+    lines.append("\n📋 API Key Configuration Status\n\n")
 
     # Check environment
-    env_key = os.getenv('ANTHROPIC_API_KEY')
+    if env_key is None:
+        _load_dotenv()
+        env_key = os.getenv('ANTHROPIC_API_KEY')
     if env_key:
-        print(f"  ✅ Environment: ANTHROPIC_API_KEY is set (ends with ...{env_key[-4:]})")
+        lines.append(f"  ✅ Environment: ANTHROPIC_API_KEY is set (ends with ...{env_key[-4:]})\n")
     else:
-        print("  ❌ Environment: ANTHROPIC_API_KEY not set")
+        lines.append("  ❌ Environment: ANTHROPIC_API_KEY not set\n")
+
+    if env_only:
+        lines.append("\n")
+        sys.stdout.write("".join(lines))
+        return
 
     # Check project config
     project_config = Path(PROJECT_CONFIG)
     if project_config.exists():
         try:
-            config = json.loads(project_config.read_text())
+            config = _read_config(project_config)
             if config.get('anthropic_api_key'):
                 key = config['anthropic_api_key']
-                print(f"  ✅ Project: {PROJECT_CONFIG} (ends with ...{key[-4:]})")
+                lines.append(f"  ✅ Project: {PROJECT_CONFIG} (ends with ...{key[-4:]})\n")
             else:
-                print(f"  ⚠️  Project: {PROJECT_CONFIG} exists but no API key")
-        except:
-            print(f"  ❌ Project: {PROJECT_CONFIG} exists but is invalid")
+                lines.append(f"  ⚠️  Project: {PROJECT_CONFIG} exists but no API key\n")
+        except Exception:
+            lines.append(f"  ❌ Project: {PROJECT_CONFIG} exists but is invalid\n")
     else:
-        print(f"  ❌ Project: {PROJECT_CONFIG} not found")
+        lines.append(f"  ❌ Project: {PROJECT_CONFIG} not found\n")
 
     # Check global config
     if GLOBAL_CONFIG.exists():
         try:
-            config = json.loads(GLOBAL_CONFIG.read_text())
+            config = _read_config(GLOBAL_CONFIG)
             if config.get('anthropic_api_key'):
                 key = config['anthropic_api_key']
-                print(f"  ✅ Global: {GLOBAL_CONFIG} (ends with ...{key[-4:]})")
+                lines.append(f"  ✅ Global: {GLOBAL_CONFIG} (ends with ...{key[-4:]})\n")
             else:
-                print(f"  ⚠️  Global: {GLOBAL_CONFIG} exists but no API key")
-        except:
-            print(f"  ❌ Global: {GLOBAL_CONFIG} exists but is invalid")
+                lines.append(f"  ⚠️  Global: {GLOBAL_CONFIG} exists but no API key\n")
+        except Exception:
+            lines.append(f"  ❌ Global: {GLOBAL_CONFIG} exists but is invalid\n")
     else:
-        print(f"  ❌ Global: {GLOBAL_CONFIG} not found")
+        lines.append(f"  ❌ Global: {GLOBAL_CONFIG} not found\n")
 
-    print("\n  Priority: Environment > Project > Global\n")
+    lines.append("\n  Priority: Environment > Project > Global\n\n")
+    sys.stdout.write("".join(lines))
 
 
 def get_memory_file(file_path: str | None = None):
     """Find a memory file - either specified or the most recent"""
-    import re
-    memory_dir = Path(os.path.abspath('.memory'))
+    # A full path doesn't need .memory/ at all
+    if file_path and os.path.isabs(file_path):
+        target = Path(file_path)
+        if not target.exists():
+            print(f"❌ File not found: {target}")
+            sys.exit(1)
+        return target
+
+    memory_dir = Path('.memory')
 
     if not memory_dir.exists():
         print("❌ .memory/ directory not found")
         sys.exit(1)
 
-    # If a specific file is requested
+    # If a specific file is requested (filename relative to .memory/)
     if file_path:
-        # Check if it's just a filename or a full path
-        if os.path.isabs(file_path):
-            target = Path(file_path)
-        else:
-            target = memory_dir / file_path
-
+        target = memory_dir / file_path
         if not target.exists():
             print(f"❌ File not found: {target}")
             sys.exit(1)
@@ -179,35 +273,45 @@ def get_memory_file(file_path: str | None = None):
     # Find all letter files matching either format:
     # - Old: letter_XXXX.md (e.g., letter_0001.md)
     # - New: letter_YYYYMMDD_XXXX.md (e.g., letter_20260130_0001.md)
-    letter_files = []
-    for f in memory_dir.glob('letter_*.md'):
-        # New format: letter_YYYYMMDD_XXXX.md
-        match = re.match(r'letter_(\d{8})_(\d{4})\.md$', f.name)
-        if match:
-            # Sort key: date + counter as a single sortable string
-            sort_key = f"{match.group(1)}_{match.group(2)}"
-            letter_files.append((sort_key, f))
-            continue
-
-        # Old format: letter_XXXX.md (zero-padded or not)
-        match = re.match(r'letter_(\d+)\.md$', f.name)
-        if match:
-            # Prefix with zeros to sort after new format
-            sort_key = f"00000000_{int(match.group(1)):04d}"
-            letter_files.append((sort_key, f))
-
-    if not letter_files:
+    # Keep only the highest key (newest) seen so far
+    best_key = ''
+    best_path = None
+    with os.scandir(memory_dir) as entries:
+        for entry in entries:
+            match = _LETTER_RE.match(entry.name)
+            if not match:
+                continue
+
+            if match.group(1):
+                # New format: date + counter as a single sortable string
+                sort_key = f"{match.group(1)}_{match.group(2)}"
+            else:
+                # Old format: prefix with zeros to sort after new format
+                sort_key = f"00000000_{int(match.group(3)):04d}"
+
+            if sort_key > best_key:
+                best_key, best_path = sort_key, entry.path
+
+    if best_path is None:
         print("❌ No numbered letter files found in .memory/")
         sys.exit(1)
 
-    # Sort by key descending, return highest (newest)
-    letter_files.sort(key=lambda x: x[0], reverse=True)
-    return letter_files[0][1]
+    return Path(best_path)
+
+
+def get_output_file(source_file: Path) -> Path:
+    """Draft path in drafts/ for a given memory file"""
+    drafts_dir = Path('drafts')
+
+    # Generate filename based on source
+    timestamp = _today_str()
+    return drafts_dir / f"blog_{timestamp}_{source_file.stem}.md"
 
 
-def generate_blog_post(memory_content: str) -> str:
-    """Use Anthropic API to convert memory file to blog post"""
-    api_key = get_api_key()
+def generate_blog_post(memory_content: str, output_file: Path,
+                       env_key: str | None = None) -> Path:
+    """Use Anthropic API to convert memory file to blog post, streamed to output_file"""
+    api_key = get_api_key(env_key=env_key)
 
     if not api_key:
         print("❌ No API key found!")
@@ -217,117 +321,159 @@ def generate_blog_post(memory_content: str) -> str:
         print("\nOr set the ANTHROPIC_API_KEY environment variable.")
         sys.exit(1)
 
-    _load_anthropic()
-    client = anthropic.Anthropic(api_key=api_key)
-
-    prompt = f"""You are a technical blog writer. Convert this development session memory into an engaging, public-ready blog post.
-
-INPUT (Session Memory):
-{memory_content}
-
-REQUIREMENTS:
-1. Transform technical decisions into narrative insights
-2. Keep the "Pain Log" as "Lessons Learned" or "Challenges"
-3. Make it readable for a general developer audience
-4. Add markdown frontmatter with: title, date, tags, excerpt
-5. Use proper markdown formatting with headers, code blocks, lists
-6. Maintain technical accuracy but improve readability
-
-OUTPUT FORMAT:
----
-title: "[Engaging Title]"
-date: {datetime.now().strftime('%Y-%m-%d')}
-tags: [relevant, tags, here]
-excerpt: "Brief summary of the post"
----
+    # The lazy module only really imports on first attribute access, so a
+    # broken install (e.g. a missing dependency) surfaces here too
+    anthropic = lazy_import('anthropic')
+    try:
+        if anthropic is None:
+            raise ImportError("No module named 'anthropic'")
+        client_cls = anthropic.Anthropic
+    except ImportError:
+        sys.modules.pop('anthropic', None)
+        print("❌ anthropic package not installed")
+        print("   Run: pip install anthropic")
+        sys.exit(1)
+    client = client_cls(api_key=api_key)
+
+    # Only the tail of very long memories is sent (most recent session info)
+    if len(memory_content) > MAX_MEMORY_CHARS:
+        print(f"⚠️  Memory is {len(memory_content)} chars; "
+              f"sending only the last {MAX_MEMORY_CHARS}")
+        memory_content = memory_content[-MAX_MEMORY_CHARS:]
+
+    prompt = "".join((
+        _PROMPT_PREFIX,
+        memory_content,
+        _PROMPT_SUFFIX_TMPL.format(date=_today_str()),
+    ))
+
+    # Write tokens to a .part file as they arrive; it only replaces the
+    # draft once the stream completes, so an earlier draft survives failures
+    output_file.parent.mkdir(exist_ok=True)
+    part_file = output_file.with_name(output_file.name + '.part')
+    try:
+        with client.messages.stream(
+            model="claude-sonnet-4-20250514",
+            max_tokens=4096,
+            messages=[
+                {"role": "user", "content": prompt}
+            ]
+        ) as stream, open(part_file, 'w', encoding='utf-8') as out:
+            for text in stream.text_stream:
+                out.write(text)
+        os.replace(part_file, output_file)
+    except BaseException:
+        part_file.unlink(missing_ok=True)
+        raise
 
-[Blog post content in markdown]
+    print(f"✅ Blog post generated: {output_file}")
+    return output_file
 
-Generate the blog post now:"""
 
-    message = client.messages.create(
-        model="claude-sonnet-4-20250514",
-        max_tokens=4096,
-        messages=[
-            {"role": "user", "content": prompt}
-        ]
-    )
+_USAGE = ("usage: blog_gen.py [-h] [--file FILE] [--setup] [--setup-project] [--status]\n"
+          "                   [--status-env-only]\n")
 
-    return message.content[0].text
+_HELP_TEXT = _USAGE + """
+Letter to Blog Blog Generator - Convert session memories to blog posts
 
+options:
+  -h, --help            show this help message and exit
+  --file FILE, -f FILE  Specific memory file to convert (filename or full path)
+  --setup               Set up global API key (~/.config/letter-for-my-future-self/)
+  --setup-project       Set up project-specific API key (.letter-config.json)
+  --status              Show current API key configuration status
+  --status-env-only     Like --status, but only check the environment variable
 
-def save_blog_post(content: str, source_file: Path):
-    """Save generated blog post to drafts/"""
-    drafts_dir = Path(os.path.abspath('drafts'))
-    drafts_dir.mkdir(exist_ok=True)
+Examples:
+  python blog_gen.py                  # Generate blog from latest memory
+  python blog_gen.py --file letter_20260130_0001.md  # Generate from specific file
+  python blog_gen.py --setup          # Set up global API key
+  python blog_gen.py --setup-project  # Set up project-specific API key
+  python blog_gen.py --status         # Show API key configuration
+  python blog_gen.py --status-env-only  # Quick CI preflight check
+"""
 
-    # Generate filename based on source
-    timestamp = datetime.now().strftime('%Y-%m-%d')
-    output_file = drafts_dir / f"blog_{timestamp}_{source_file.stem}.md"
 
-    output_file.write_text(content, encoding='utf-8')
-    print(f"✅ Blog post generated: {output_file}")
-    return output_file
+def _usage_error(message: str):
+    """Report a command-line error the way argparse would"""
+    sys.stderr.write(f"{_USAGE}blog_gen.py: error: {message}\n")
+    sys.exit(2)
 
 
 def main():
     """Main execution flow with CLI argument handling"""
-    import argparse
+    # Hand-rolled parsing: argparse costs more to import than this CLI needs
+    args = sys.argv[1:]
+    if '-h' in args or '--help' in args:
+        sys.stdout.write(_HELP_TEXT)
+        return
 
-    parser = argparse.ArgumentParser(
-        description="Letter to Blog Blog Generator - Convert session memories to blog posts",
-        formatter_class=argparse.RawDescriptionHelpFormatter,
-        epilog="""
-Examples:
-  python blog_gen.py                  # Generate blog from latest memory
-  python blog_gen.py --file letter_20260130_0001.md  # Generate from specific file
-  python blog_gen.py --setup          # Set up global API key
-  python blog_gen.py --setup-project  # Set up project-specific API key
-  python blog_gen.py --status         # Show API key configuration
-        """
-    )
-    parser.add_argument('--file', '-f', type=str,
-                        help='Specific memory file to convert (filename or full path)')
-    parser.add_argument('--setup', action='store_true',
-                        help='Set up global API key (~/.config/letter-for-my-future-self/)')
-    parser.add_argument('--setup-project', action='store_true',
-                        help='Set up project-specific API key (.letter-config.json)')
-    parser.add_argument('--status', action='store_true',
-                        help='Show current API key configuration status')
+    file_path = None
+    flags = set()
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg in ('--file', '-f'):
+            if i + 1 >= len(args):
+                _usage_error("argument --file/-f: expected one argument")
+            file_path = args[i + 1]
+            i += 1
+        elif arg.startswith('--file='):
+            file_path = arg.split('=', 1)[1]
+        elif arg.startswith('-f') and len(arg) > 2:
+            file_path = arg[2:]
+        elif arg in ('--setup', '--setup-project', '--status', '--status-env-only'):
+            flags.add(arg)
+        else:
+            _usage_error(f"unrecognized arguments: {arg}")
+        i += 1
 
-    args = parser.parse_args()
+    env_key = os.environ.get('ANTHROPIC_API_KEY')
 
     # Handle setup commands
-    if args.setup:
+    if '--setup' in flags:
         setup_api_key(scope="global")
         return
-    if args.setup_project:
+    if '--setup-project' in flags:
         setup_api_key(scope="project")
         return
-    if args.status:
-        show_config_status()
+    if '--status' in flags:
+        show_config_status(env_key=env_key)
+        return
+    if '--status-env-only' in flags:
+        show_config_status(env_key=env_key, env_only=True)
         return
 
     # Normal blog generation flow
     print("🎨 Letter to Blog: Generating blog post...")
 
     # Get memory file (specific or latest)
-    memory_file = get_memory_file(args.file)
+    memory_file = get_memory_file(file_path)
     print(f"📖 Reading: {memory_file}")
 
     # Read content
-    memory_content = memory_file.read_text(encoding='utf-8')
+    memory_content = memory_file.read_bytes().decode('utf-8')
 
-    # Generate blog post
+    # Generate blog post, streamed straight into drafts/
     print("🤖 Calling Anthropic API...")
-    blog_content = generate_blog_post(memory_content)
-
-    # Save to drafts
-    output_file = save_blog_post(blog_content, memory_file)
+    output_file = generate_blog_post(
+        memory_content, get_output_file(memory_file), env_key=env_key
+    )
 
     print(f"✅ Success! Blog post saved to: {output_file}")
     print("🚀 Ready for review and publishing!")
 
 
+# Surface broken deferred imports at load time when requested
+if os.environ.get('MINITIK_EAGER_IMPORT') == '1':
+    import anthropic as _
+    import datetime as _
+    import json as _
+    try:
+        import dotenv as _
+    except ImportError:
+        pass  # dotenv is optional
+
+
 if __name__ == "__main__":
     main()